@@ -38,7 +38,7 @@ ENTERPRISE_WECHAT_WEBHOOK_LIST = [
 
 
 # 运行配置
-# 监控间隔（秒）
+# 监控间隔（秒）：空闲时的最长轮询间隔；发现新消息后临时缩短到 1 秒，再逐步恢复到该值
 CHECK_INTERVAL = 30
 
 # Chrome配置
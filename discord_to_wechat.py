@@ -9,26 +9,54 @@ Discord到微信/企业微信消息桥接器
 2. 企业微信机器人（Webhook）- 发送到企业微信群
 """
 
-from typing import List, Dict
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sys
+import threading
+from typing import List
 
 # 导入核心模块
 from src.core.config_manager import app_config
 from src.core.models import DiscordMessage
 from src.utils.logger import get_logger, setup_logger
 
-# 导入业务模块
-from src.services.listener.discord_listener import DiscordListener
+# 导入业务模块（监听器依赖 Selenium，延迟到创建桥接器时再导入）
 from src.services.sender.base import MessageSender
-from src.services.sender.wechat import WechatSender
-from src.services.sender.working_wechat import WorkingWechatSender
 
 # 初始化日志
 logger = setup_logger()
 
+# 配置模板中的占位符（Webhook、接收者名称共用一个预编译的正则）
+_PLACEHOLDER_RE = re.compile(r"YOUR_WEBHOOK_KEY|你的大号")
+
+# 预先生成的分隔线与步骤标题模板
+_SEP50 = "=" * 50
+_SEP60 = "=" * 60
+_STEP_TEMPLATE = f"\n{_SEP50}\n{{msg}}\n{_SEP50}"
+
+
+def _warm_bytecode():
+    """预编译 src 下的模块，下次冷启动直接使用 .pyc"""
+    # 用户显式禁用了字节码写入（如 PYTHONDONTWRITEBYTECODE）时不做预热
+    if sys.dont_write_bytecode:
+        return
+    try:
+        import compileall
+        src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+        # 已在后台线程中运行，单进程编译即可，避免在多线程进程里 fork
+        compileall.compile_dir(src_dir, quiet=1, workers=1)
+    except Exception as e:
+        logger.debug(f"预编译字节码失败: {e}")
+
 
 class DiscordToWechatBridge:
     """Discord到微信/企业微信的消息桥接器"""
     
+    __slots__ = ("config", "sender", "_listener", "_listener_kwargs")
+    
     def __init__(self):
         """初始化Discord到微信的消息桥"""
         # 从配置管理器加载配置
@@ -37,14 +65,24 @@ class DiscordToWechatBridge:
         # 初始化消息发送器
         self.sender = self._create_sender()
         
-        # 初始化Discord监听器
-        self.listener = DiscordListener(
+        # Discord监听器在首次使用时才创建（见 listener 属性）
+        self._listener_kwargs = dict(
             channel_urls=self.config.discord_channel_urls,
-            on_new_message=self._on_new_message,
+            on_new_messages=self._on_new_messages,
             check_interval=self.config.check_interval,
             headless_mode=self.config.headless_mode
         )
     
+    @property
+    def listener(self):
+        """Discord监听器（懒加载，发送器初始化失败时不会触碰 Selenium）"""
+        listener = getattr(self, '_listener', None)
+        if listener is None:
+            from src.services.listener.discord_listener import DiscordListener
+            listener = DiscordListener(**self._listener_kwargs)
+            self._listener = listener
+        return listener
+    
     def _create_sender(self) -> MessageSender:
         """创建消息发送器"""
         sender_type = self.config.sender_type
@@ -54,6 +92,8 @@ class DiscordToWechatBridge:
             if not self.config.wechat_receiver_name or self.config.wechat_receiver_name == "na":
                 logger.error("❌ 请先在 config.py 中配置 WECHAT_RECEIVER_NAME")
                 raise ValueError("微信接收者名称未配置")
+            # 按需导入，避免未使用的发送器拖慢启动（itchat 依赖较重）
+            from src.services.sender.wechat import WechatSender
             return WechatSender(receiver_name=self.config.wechat_receiver_name)
         
         elif sender_type == "enterprise_wechat":
@@ -66,6 +106,7 @@ class DiscordToWechatBridge:
                 logger.error("❌ 请先在 config.py 中配置 ENTERPRISE_WECHAT_WEBHOOK_LIST 或 ENTERPRISE_WECHAT_WEBHOOK")
                 raise ValueError("企业微信Webhook未配置")
             
+            from src.services.sender.working_wechat import WorkingWechatSender
             return WorkingWechatSender(
                 webhook_url=self.config.enterprise_wechat_webhook,
                 webhook_configs=self.config.enterprise_wechat_webhook_list
@@ -76,24 +117,22 @@ class DiscordToWechatBridge:
             logger.error("   支持的类型: wechat, enterprise_wechat")
             raise ValueError(f"不支持的发送器类型: {sender_type}")
     
-    def _on_new_message(self, message: DiscordMessage):
+    def _on_new_messages(self, messages: List[DiscordMessage]):
         """
-        新消息回调函数
-        :param message: Discord消息对象
+        新消息回调函数（同一频道同一轮发现的消息一起回调）
+        :param messages: Discord消息对象列表
         """
-        # 发送消息
-        self.sender.send_message(message)
+        # 由发送器决定逐条发送还是合并发送
+        self.sender.send_messages(messages)
     
     def run(self):
         """运行主程序"""
         try:
             logger.info("🚀 Discord to WeChat Bridge 启动中...")
-            logger.info("=" * 50)
+            logger.info(_SEP50)
             
             # 步骤 1: 初始化并登录发送器
-            logger.info("\n" + "=" * 50)
-            logger.info("🔧 步骤 1/4: 初始化消息发送器...")
-            logger.info("=" * 50)
+            logger.info(_STEP_TEMPLATE.format(msg="🔧 步骤 1/4: 初始化消息发送器..."))
             
             if not self.sender.login():
                 logger.error("❌ 消息发送器初始化失败，程序退出")
@@ -102,22 +141,19 @@ class DiscordToWechatBridge:
             # 启动发送器的保持活跃线程（如果需要）
             self.sender.keep_alive()
             
+            # 后台预编译字节码，不阻塞启动流程
+            threading.Thread(target=_warm_bytecode, daemon=True).start()
+            
             # 步骤 2: 初始化浏览器
-            logger.info("\n" + "=" * 50)
-            logger.info("🔧 步骤 2/4: 初始化Chrome浏览器...")
-            logger.info("=" * 50)
+            logger.info(_STEP_TEMPLATE.format(msg="🔧 步骤 2/4: 初始化Chrome浏览器..."))
             self.listener.init_chrome()
             
             # 步骤 3: 登录Discord
-            logger.info("\n" + "=" * 50)
-            logger.info("🔐 步骤 3/4: 登录Discord...")
-            logger.info("=" * 50)
+            logger.info(_STEP_TEMPLATE.format(msg="🔐 步骤 3/4: 登录Discord..."))
             self.listener.login_discord()
             
             # 步骤 4: 打开频道并开始监控
-            logger.info("\n" + "=" * 50)
-            logger.info("📱 步骤 4/4: 打开Discord频道并开始监控...")
-            logger.info("=" * 50)
+            logger.info(_STEP_TEMPLATE.format(msg="📱 步骤 4/4: 打开Discord频道并开始监控..."))
             self.listener.navigate_to_channel()
             
             # 开始监控消息
@@ -125,6 +161,9 @@ class DiscordToWechatBridge:
             
         except KeyboardInterrupt:
             logger.info("\n\n⏹️  程序被用户中断")
+        except ValueError as e:
+            # 已知的配置类错误，无需打印堆栈
+            logger.error(f"\n❌ 程序异常: {e}")
         except Exception as e:
             logger.error(f"\n❌ 程序异常: {e}", exc_info=True)
         finally:
@@ -134,13 +173,15 @@ class DiscordToWechatBridge:
         """清理资源"""
         logger.info("\n🧹 清理资源...")
         
-        # 清理监听器
-        if hasattr(self, 'listener') and self.listener:
-            self.listener.cleanup()
+        # 清理监听器（未创建过则无需清理）
+        listener = getattr(self, '_listener', None)
+        if listener:
+            listener.cleanup()
         
         # 清理发送器
-        if hasattr(self, 'sender') and self.sender:
-            self.sender.cleanup()
+        sender = getattr(self, 'sender', None)
+        if sender:
+            sender.cleanup()
         
         logger.info("👋 程序已退出")
 
@@ -156,13 +197,13 @@ def validate_config():
         return False
     
     if app_config.sender_type == "wechat":
-        if "你的大号" in app_config.wechat_receiver_name or app_config.wechat_receiver_name == "na":
+        if _PLACEHOLDER_RE.search(app_config.wechat_receiver_name) or app_config.wechat_receiver_name == "na":
             logger.error("❌ 请先在 config.py 中配置 WECHAT_RECEIVER_NAME")
             return False
     
     elif app_config.sender_type == "enterprise_wechat":
         valid_list = app_config.enterprise_wechat_webhook_list and len(app_config.enterprise_wechat_webhook_list) > 0
-        valid_single = app_config.enterprise_wechat_webhook and "YOUR_WEBHOOK_KEY" not in app_config.enterprise_wechat_webhook
+        valid_single = app_config.enterprise_wechat_webhook and not _PLACEHOLDER_RE.search(app_config.enterprise_wechat_webhook)
         
         if not valid_list and not valid_single:
             logger.error("❌ 请先在 config.py 中配置 ENTERPRISE_WECHAT_WEBHOOK_LIST 或 ENTERPRISE_WECHAT_WEBHOOK")
@@ -173,9 +214,11 @@ def validate_config():
 
 def print_startup_info():
     """打印启动信息"""
-    logger.info("\n" + "=" * 60)
-    logger.info("    Discord to WeChat/Enterprise WeChat Bridge")
-    logger.info("=" * 60)
+    # 日志级别高于 INFO 时整段横幅都不会输出，直接跳过字符串构造
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    
+    logger.info(f"\n{_SEP60}\n    Discord to WeChat/Enterprise WeChat Bridge\n{_SEP60}")
     
     # 发送方式信息
     if app_config.sender_type == "wechat":
@@ -197,14 +240,14 @@ def print_startup_info():
     logger.info(f"\n⚙️  运行配置:")
     logger.info(f"   检查间隔: {app_config.check_interval} 秒")
     logger.info(f"   无头模式: {'是' if app_config.headless_mode else '否'}")
-    logger.info("=" * 60 + "\n")
+    logger.info(_SEP60 + "\n")
 
 
 def main():
     """主函数"""
-    # 验证配置
+    # 验证配置（失败即以非零状态码退出，便于 supervisor/systemd 感知）
     if not validate_config():
-        return
+        sys.exit(1)
     
     # 打印启动信息
     print_startup_info()
@@ -1,45 +1,72 @@
 import importlib.util
 import os
 import sys
-from typing import List, Dict, Optional, Any
-
-class Config:
-    """配置管理类"""
-    
-    def __init__(self):
-        self.sender_type: str = "wechat"
-        self.discord_channel_urls: List[str] = []
-        self.wechat_receiver_name: str = ""
-        self.enterprise_wechat_webhook: str = ""
-        self.enterprise_wechat_webhook_list: List[Dict[str, str]] = []
-        self.check_interval: int = 3
-        self.headless_mode: bool = False
-        
-        self.load_config()
-
-    def load_config(self):
-        """从 config.py 加载配置"""
-        try:
-            # 动态导入根目录下的 config.py
-            config_path = os.path.join(os.getcwd(), 'config.py')
-            spec = importlib.util.spec_from_file_location("config", config_path)
-            if spec and spec.loader:
-                config_module = importlib.util.module_from_spec(spec)
-                sys.modules["config"] = config_module
-                spec.loader.exec_module(config_module)
-                
-                # 安全读取配置
-                self.sender_type = getattr(config_module, 'SENDER_TYPE', 'wechat')
-                self.discord_channel_urls = getattr(config_module, 'DISCORD_CHANNEL_URLS', [])
-                self.wechat_receiver_name = getattr(config_module, 'WECHAT_RECEIVER_NAME', '')
-                self.enterprise_wechat_webhook = getattr(config_module, 'ENTERPRISE_WECHAT_WEBHOOK', '')
-                self.enterprise_wechat_webhook_list = getattr(config_module, 'ENTERPRISE_WECHAT_WEBHOOK_LIST', [])
-                self.check_interval = getattr(config_module, 'CHECK_INTERVAL', 3)
-                self.headless_mode = getattr(config_module, 'HEADLESS_MODE', False)
-        except Exception as e:
-            print(f"加载配置文件失败: {e}")
-            # 可以抛出异常或者使用默认值
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    tomllib = None
+from dataclasses import dataclass, field, fields
+from typing import List, Dict, Any
+
+@dataclass(frozen=True, slots=True)
+class AppConfig:
+    """配置快照（字段名对应 config.py 中的大写配置项，如 sender_type -> SENDER_TYPE）"""
+    sender_type: str = "wechat"
+    discord_channel_urls: List[str] = field(default_factory=list)
+    wechat_receiver_name: str = ""
+    enterprise_wechat_webhook: str = ""
+    enterprise_wechat_webhook_list: List[Dict[str, str]] = field(default_factory=list)
+    check_interval: int = 3
+    headless_mode: bool = False
+
+
+def _read_config_file(config_path: str) -> Dict[str, Any]:
+    """执行 config.py 并一次性读取所有配置项"""
+    # 动态导入根目录下的 config.py
+    spec = importlib.util.spec_from_file_location("config", config_path)
+    if not (spec and spec.loader):
+        raise ImportError(f"无法加载配置文件: {config_path}")
+    config_module = importlib.util.module_from_spec(spec)
+    sys.modules["config"] = config_module
+    spec.loader.exec_module(config_module)
+
+    # 安全读取配置，缺失项使用默认值
+    defaults = AppConfig()
+    return {
+        f.name: getattr(config_module, f.name.upper(), getattr(defaults, f.name))
+        for f in fields(AppConfig)
+    }
 
-# 全局单例
-app_config = Config()
 
+def _read_toml_file(config_path: str) -> Dict[str, Any]:
+    """读取 config.toml（纯数据，无需编译执行），键名与 config.py 相同"""
+    if tomllib is None:
+        raise ImportError("读取 config.toml 需要 Python 3.11+，请改用 config.py")
+    with open(config_path, 'rb') as f:
+        data = tomllib.load(f)
+
+    defaults = AppConfig()
+    return {
+        f.name: data.get(f.name.upper(), getattr(defaults, f.name))
+        for f in fields(AppConfig)
+    }
+
+
+def load_config() -> AppConfig:
+    """
+    加载配置
+    优先读取 config.toml，不存在时回退到 config.py
+    """
+    try:
+        toml_path = os.path.join(os.getcwd(), 'config.toml')
+        if os.path.exists(toml_path):
+            return AppConfig(**_read_toml_file(toml_path))
+        config_path = os.path.join(os.getcwd(), 'config.py')
+        return AppConfig(**_read_config_file(config_path))
+    except Exception as e:
+        print(f"加载配置文件失败: {e}")
+        # 使用默认值
+        return AppConfig()
+
+# 全局单例
+app_config = load_config()
@@ -1,14 +1,14 @@
-from dataclasses import dataclass, field
-from typing import List, Optional
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
 from datetime import datetime
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DiscordMessage:
     id: str
     content: str
     username: str
     timestamp: datetime
     channel_url: str
-    attachments: List[str] = field(default_factory=list)
+    attachments: Tuple[str, ...] = ()
     channel_name: Optional[str] = None
-
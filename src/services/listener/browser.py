@@ -10,6 +10,16 @@ from selenium.webdriver.chrome.service import Service
 
 logger = logging.getLogger(__name__)
 
+# 无头模式下不加载图片：附件链接取自 DOM 的 href/src 属性，不依赖图片像素
+# 有界面模式保留图片，避免登录时的验证码无法显示
+_HEADLESS_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+}
+
+# HTTP 缓存本就位于持久化的用户数据目录（<user-data-dir>/Default/Cache），这里只放宽其容量上限
+_DISK_CACHE_SIZE = 256 * 1024 * 1024
+
 class BrowserManager:
     """浏览器管理器：负责 Chrome 的初始化、启动和关闭"""
 
@@ -35,22 +45,26 @@ class BrowserManager:
         # 本地 Chrome 配置
         self._configure_local_options(chrome_options)
         
-        # 启动驱动
+        # 启动驱动（keep_alive 复用与 chromedriver 之间的 HTTP 连接，避免每条命令重新建连）
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
+            self.driver = webdriver.Chrome(options=chrome_options, keep_alive=True)
         except Exception as e:
             logger.error(f"   通过 Selenium Manager 启动失败: {e}")
             logger.info("   回退到系统 chromedriver...")
             self.driver = self._init_system_chromedriver(chrome_options)
-            
+        
+        # 显式关闭隐式等待：元素查找未命中时立即返回，需要等待的地方统一用 WebDriverWait
+        self.driver.implicitly_wait(0)
         logger.info("✅ Chrome浏览器已成功启动")
         return self.driver
 
     def _init_remote_chrome(self, remote_url: str, options: Options) -> webdriver.Remote:
         if self.headless_mode:
             options.add_argument('--headless=new')
+            self._disable_images(options)
         options.add_argument('--window-size=1920,1080')
         options.add_argument('--user-data-dir=/home/seluser/discord-chrome-data')
+        options.add_argument(f'--disk-cache-size={_DISK_CACHE_SIZE}')
         options.add_argument('--profile-directory=Default')
 
         # 代理支持：
@@ -66,7 +80,8 @@ class BrowserManager:
         
         try:
             logger.info(f"   使用远程 Selenium: {remote_url}")
-            self.driver = webdriver.Remote(command_executor=remote_url, options=options)
+            self.driver = webdriver.Remote(command_executor=remote_url, options=options, keep_alive=True)
+            self.driver.implicitly_wait(0)
             logger.info("✅ Chrome浏览器已成功启动(远程)")
             return self.driver
         except Exception as e:
@@ -76,6 +91,7 @@ class BrowserManager:
     def _configure_local_options(self, options: Options):
         if self.headless_mode:
             options.add_argument('--headless=new')
+            self._disable_images(options)
             logger.info("   使用无头模式运行")
             
         options.add_argument('--no-sandbox')
@@ -83,19 +99,22 @@ class BrowserManager:
         options.add_argument('--disable-gpu')
         options.add_argument('--disable-software-rasterizer')
         options.add_argument('--disable-extensions')
-        options.add_argument('--no-zygote')
-        options.add_argument('--disable-features=VizDisplayCompositor,UseOzonePlatform')
         options.add_argument('--remote-debugging-port=9222')
         options.add_argument('--window-size=1920,1080')
         options.add_argument('--user-data-dir=./chrome_data')
+        options.add_argument(f'--disk-cache-size={_DISK_CACHE_SIZE}')
         options.add_argument('--disable-blink-features=AutomationControlled')
         options.add_experimental_option('excludeSwitches', ['enable-automation'])
         options.add_experimental_option('useAutomationExtension', False)
 
+    def _disable_images(self, options: Options):
+        options.add_experimental_option('prefs', _HEADLESS_PREFS)
+        options.add_argument('--blink-settings=imagesEnabled=false')
+
     def _init_system_chromedriver(self, options: Options) -> webdriver.Chrome:
         try:
             chromedriver_path = shutil.which('chromedriver') or '/usr/bin/chromedriver'
-            return webdriver.Chrome(service=Service(executable_path=chromedriver_path), options=options)
+            return webdriver.Chrome(service=Service(executable_path=chromedriver_path), options=options, keep_alive=True)
         except Exception as e:
             logger.error(f"   使用系统 chromedriver 启动失败: {e}")
             raise
@@ -5,8 +5,15 @@ Discord消息监听器
 使用Selenium监听Discord频道的新消息
 """
 
+import json
+import logging
+import queue
+import sys
+import threading
 import time
-from typing import List, Callable, Optional
+from datetime import datetime
+from typing import Dict, List, Callable, Optional
+from selenium.common.exceptions import JavascriptException, TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -14,10 +21,118 @@ from selenium.webdriver.support import expected_conditions as EC
 from src.core.models import DiscordMessage
 from src.utils.logger import get_logger
 from src.services.listener.browser import BrowserManager
-from src.services.listener.discord_parser import DiscordParser
+from src.services.listener.discord_parser import DiscordParser, EXTRACT_MESSAGE_FN
 
 logger = get_logger(__name__)
 
+# 频道消息列表的最长加载等待（秒），超时按监控错误处理
+_LIST_LOAD_TIMEOUT = 10
+
+# 投递线程停止信号
+_STOP = object()
+
+# 在页面内完成“上次消息之后的新消息”比对与提取，一次 execute_script 返回全部新消息
+# 返回 {status: 'first' | 'found' | 'missing', messages: [...]}，页面无消息时返回 null
+COLLECT_NEW_MESSAGES_JS = EXTRACT_MESSAGE_FN + r"""
+const lastId = arguments[0];
+
+// 把 tag[class*="token"] 换成消息列表中实际出现的哈希类名（如 span.username_c19a55）
+// 精确选择器是通配选择器的子集，匹配数量相同才采用，否则保留通配写法
+function specializeSelector(root, css) {
+    let exact = css;
+    for (const m of css.matchAll(/(\w*)\[class\*="([\w-]+)"\]/g)) {
+        const node = root.querySelector(m[0]);
+        const cls = node && Array.from(node.classList).find((c) => c.startsWith(m[2] + '_'));
+        if (!cls) return css;
+        exact = exact.replace(m[0], m[1] + '.' + CSS.escape(cls));
+    }
+    if (exact === css) return css;
+    return root.querySelectorAll(exact).length === root.querySelectorAll(css).length ? exact : css;
+}
+
+// 在消息列表上挂一个 MutationObserver，列表没有增删节点且游标停在上次扫描到的最后一条时直接返回，不再查询 DOM
+// 列表容器被 Discord 整体替换（切换频道/重新渲染）时重新挂载，并视为有变化
+const list = document.querySelector(SEL.list);
+// 同时用 IntersectionObserver 标记已在可视区域内渲染的消息（data-d2w-visible），可见时无需再滚动
+if (list && window.__d2wObserved !== list) {
+    if (window.__d2wObserver) window.__d2wObserver.disconnect();
+    if (window.__d2wVisibility) window.__d2wVisibility.disconnect();
+    const visibility = new IntersectionObserver((entries) => {
+        entries.forEach((e) => { e.target.dataset.d2wVisible = e.isIntersecting ? '1' : ''; });
+    });
+    list.querySelectorAll(SEL.item).forEach((n) => visibility.observe(n));
+    window.__d2wVisibility = visibility;
+    window.__d2wObserver = new MutationObserver((mutations) => {
+        window.__d2wDirty = true;
+        for (const m of mutations) {
+            m.addedNodes.forEach((n) => { if (n.nodeType === 1 && n.matches(SEL.item)) visibility.observe(n); });
+            // 虚拟列表回收的节点取消观察，避免长时间运行后累积已脱离文档的节点
+            m.removedNodes.forEach((n) => { if (n.nodeType === 1) visibility.unobserve(n); });
+        }
+    });
+    window.__d2wObserver.observe(list, {childList: true});
+    window.__d2wObserved = list;
+    window.__d2wDirty = true;
+    window.__d2wSel = null;
+}
+// 列表（重新）挂载后，或 extractMessage 发现精确类选择器漏匹配而清除结果后，重新嗅探类名（下一轮生效）
+if (list && !window.__d2wSel) {
+    const specialized = {};
+    for (const [key, css] of Object.entries(BASE_SEL)) {
+        specialized[key] = Array.isArray(css) ? css.map((c) => specializeSelector(list, c)) : specializeSelector(list, css);
+    }
+    window.__d2wSel = specialized;
+}
+if (list && lastId !== null && !window.__d2wDirty && window.__d2wLastSeen === lastId) {
+    return {status: 'found', messages: []};
+}
+window.__d2wDirty = false;
+
+// 页面内游标：从上次最后一条消息节点向后遍历兄弟节点，无需查询和扫描整个列表
+// 节点失效（被虚拟列表回收）或游标不一致时按 id 直接定位，仍找不到才回退到整表查询
+let anchor = null;
+if (lastId !== null) {
+    const cached = window.__d2wLastNode;
+    anchor = (cached && cached.isConnected && cached.id === lastId) ? cached : document.getElementById(lastId);
+}
+
+let status, newItems;
+if (anchor) {
+    status = 'found';
+    newItems = [];
+    for (let n = anchor.nextElementSibling; n; n = n.nextElementSibling) {
+        if (n.matches(SEL.item)) newItems.push(n);
+    }
+} else {
+    const items = document.querySelectorAll(SEL.item);
+    if (!items.length) return null;
+    status = lastId === null ? 'first' : 'missing';
+    newItems = [items[items.length - 1]];
+}
+
+const lastNode = newItems.length ? newItems[newItems.length - 1] : anchor;
+window.__d2wLastNode = lastNode;
+window.__d2wLastSeen = lastNode.id;
+
+// 最后一条新消息不在可视区域时才滚动一次，前面的新消息随之进入可视范围
+if (newItems.length && lastNode.dataset.d2wVisible !== '1') {
+    try { lastNode.scrollIntoView({block: 'end'}); } catch (e) {}
+}
+const messages = [];
+for (const item of newItems) {
+    try {
+        messages.push(extractMessage(item));
+    } catch (e) {}
+}
+return {status: status, messages: messages};
+"""
+
+# CDP 路径：脚本只在每个页面（标签页加载/刷新后）安装一次为 window.__d2wCollect，之后每轮只发送一行调用表达式
+# 页面中尚未安装时调用表达式返回哨兵值，由 _collect 安装后重试
+_COLLECT_INSTALL_JS = "window.__d2wCollect = function () {\n" + COLLECT_NEW_MESSAGES_JS + "\n};"
+_COLLECT_MISSING = '__d2w_missing__'
+_COLLECT_CALL_JS = "typeof window.__d2wCollect === 'function' ? window.__d2wCollect(%s) : '" + _COLLECT_MISSING + "'"
+
 
 class DiscordListener:
     """Discord消息监听器"""
@@ -25,41 +140,76 @@ class DiscordListener:
     def __init__(
         self,
         channel_urls: List[str],
-        on_new_message: Callable[[DiscordMessage], None],
+        on_new_messages: Callable[[List[DiscordMessage]], None],
         check_interval: int = 3,
         headless_mode: bool = False
     ):
         """
         初始化Discord监听器
         :param channel_urls: Discord频道URL列表
-        :param on_new_message: 新消息回调函数，参数为 (message: DiscordMessage)
+        :param on_new_messages: 新消息回调函数，每轮每个频道调用一次，参数为 (messages: List[DiscordMessage])，在投递线程中执行
         :param check_interval: 检查间隔（秒）
         :param headless_mode: 是否使用无头模式
         """
         self.channel_urls = channel_urls if isinstance(channel_urls, list) else [channel_urls]
-        self.on_new_message = on_new_message
+        self.on_new_messages = on_new_messages
         self.check_interval = check_interval
         
         # 浏览器管理器
         self.browser_manager = BrowserManager(headless_mode)
         self.driver = None
         
-        # 为每个频道维护独立的最后消息ID
-        self.last_message_ids = {url: None for url in self.channel_urls}
+        # 为每个频道维护独立的最后消息ID（频道列表启动后固定，不做淘汰；支持热加载频道列表时再统一清理被移除频道的各项状态）
+        self.last_message_ids: Dict[str, Optional[str]] = {url: None for url in self.channel_urls}
+        # 频道列表启动后固定，频道名称预先计算
+        self.channel_names = {url: self.get_channel_name(url) for url in self.channel_urls}
         # 为每个频道维护独立的浏览器标签页句柄（window handle）
         self.channel_handles = {}
+        # 驱动当前所在的标签页句柄（由本类切换时维护，省去每次查询 current_window_handle；不确定时为 None）
+        self._current_handle: Optional[str] = None
+        # 为每个频道记录最近一次取到的消息作者，连续消息没有头部时直接复用
+        self.last_username_by_channel: Dict[str, str] = {}
+        # 为每个频道记录已处理消息的最新时间戳，页面刷新找不到上次消息ID时避免重复转发
+        self.last_timestamps: Dict[str, datetime] = {}
+        # 消息列表尚未出现的频道及其开始等待的时间，等待期间不阻塞其它频道的轮询
+        self._empty_since: Dict[str, float] = {}
+        # 是否通过 CDP Runtime.evaluate 执行提取脚本（init_chrome 时按驱动类型确定）
+        self._use_cdp = False
+        
+        # 投递线程：新消息经队列交给单独线程回调，发送慢时不阻塞其它频道的轮询（队列保证先后顺序）
+        self._delivery_queue: "queue.Queue" = queue.Queue()
+        self._delivery_thread = threading.Thread(target=self._deliver_worker, daemon=True)
+        self._delivery_thread.start()
+    
+    def _deliver_worker(self):
+        """依次取出新消息批次并调用回调"""
+        while True:
+            batch = self._delivery_queue.get()
+            if batch is _STOP:
+                return
+            try:
+                self.on_new_messages(batch)
+            except Exception as e:
+                logger.error(f"❌ 处理新消息失败: {e}")
     
     def init_chrome(self):
         """初始化Chrome浏览器"""
         self.driver = self.browser_manager.init_chrome()
+        # 本地 Chrome 驱动支持直接发送 CDP 命令；远程驱动（Selenium Grid）没有该接口，仍使用 execute_script
+        self._use_cdp = hasattr(self.driver, 'execute_cdp_cmd')
     
     def login_discord(self):
         """登录Discord（首次需要手动登录）"""
         logger.info("⏳ 正在打开Discord...")
         self.driver.get('https://discord.com/login')
         
-        # 检查是否已经登录
-        time.sleep(3)
+        # 检查是否已经登录：已登录时 Discord 会自动跳转离开登录页，否则会渲染登录表单
+        try:
+            WebDriverWait(self.driver, 10).until(
+                lambda d: 'login' not in d.current_url or d.find_elements(By.CSS_SELECTOR, 'input[name="email"]')
+            )
+        except TimeoutException:
+            pass
         current_url = self.driver.current_url
         
         if 'login' in current_url:
@@ -68,20 +218,40 @@ class DiscordListener:
             logger.info("   🌐 如果使用Docker，请访问 http://localhost:7900 在noVNC中登录")
             logger.info("   🔑 noVNC默认密码: secret")
             
-            # 等待用户登录完成
-            while 'login' in self.driver.current_url:
-                time.sleep(2)
+            # 等待用户登录完成（URL 离开登录页即刻返回），用户可能需要较长时间，超时后继续等待
+            while True:
+                try:
+                    WebDriverWait(self.driver, 600, poll_frequency=0.5).until(
+                        lambda d: 'login' not in d.current_url
+                    )
+                    break
+                except TimeoutException:
+                    logger.info("⏳ 仍在等待登录Discord...")
             
             logger.info("✅ Discord登录成功！")
-            logger.info("⏳ 正在保存登录状态，请稍候...")
-            # 登录成功后多等待几秒，确保Chrome有足够时间将会话数据写入磁盘
-            time.sleep(8)
+            logger.info("⏳ 正在等待Discord主界面加载...")
+            # 服务器列表出现说明客户端已用新会话完成初始化，会话数据由Chrome在后台写入用户目录
+            try:
+                WebDriverWait(self.driver, 30).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, 'nav[class*="guilds"], div[class*="sidebar"]'))
+                )
+            except TimeoutException:
+                logger.warning("⚠️  等待Discord主界面超时，继续执行")
             logger.info("✅ 登录状态已保存")
         else:
             logger.info("✅ Discord已经登录，跳过登录步骤")
         
-        # 等待几秒让页面完全加载
-        time.sleep(3)
+        # 等待页面加载完成
+        self._wait_page_ready()
+    
+    def _wait_page_ready(self, timeout: int = 15):
+        """等待当前页面 document.readyState 变为 complete，超时则继续"""
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+        except TimeoutException:
+            logger.warning("⚠️  等待页面加载超时，继续执行")
     
     def restart_browser(self):
         """重启浏览器并重新登录"""
@@ -93,6 +263,8 @@ class DiscordListener:
             pass
             
         self.channel_handles = {}
+        self._current_handle = None
+        self._empty_since.clear()
         self.init_chrome()
         self.login_discord()
         logger.info("✅ 浏览器重启完成")
@@ -106,33 +278,54 @@ class DiscordListener:
             logger.info(f"⏳ 正在打开 {len(self.channel_urls)} 个频道...")
             for idx, url in enumerate(self.channel_urls, 1):
                 logger.info(f"   [{idx}/{len(self.channel_urls)}] {url}")
-                self.switch_to_channel(url)
-                # 稍微等待，避免操作过快
-                time.sleep(2)
+            # 第一个频道复用当前页面，其余频道一次性在新标签页中并行加载
+            if self.channel_urls:
+                self.switch_to_channel(self.channel_urls[0])
+                self._open_tabs(self.channel_urls[1:])
 
             # 切回第一个频道
             if self.channel_urls:
                 self.switch_to_channel(self.channel_urls[0])
             logger.info("✅ 频道已成功打开")
 
+    def _open_tabs(self, urls: List[str]):
+        """
+        通过一次 window.open 批量打开频道标签页，按窗口名称（d2w-序号）建立句柄映射
+        未能映射的频道会在首次轮询时由 switch_to_channel 单独打开
+        """
+        if not urls:
+            return
+        try:
+            existing = set(self.driver.window_handles)
+            self.driver.execute_script(
+                "arguments[0].forEach((u, i) => window.open(u, 'd2w-' + i));", urls
+            )
+            for handle in self.driver.window_handles:
+                if handle in existing:
+                    continue
+                self.driver.switch_to.window(handle)
+                self._current_handle = handle
+                name = self.driver.execute_script("return window.name") or ''
+                if name.startswith('d2w-') and name[4:].isdigit() and int(name[4:]) < len(urls):
+                    self.channel_handles[urls[int(name[4:])]] = handle
+        except Exception as e:
+            self._current_handle = None
+            logger.error(f"批量打开频道标签页失败: {e}")
+
     def switch_to_channel(self, channel_url: str) -> bool:
         """切换到指定频道对应的标签页"""
         try:
             # 1. 尝试直接使用缓存的句柄
             handle = self.channel_handles.get(channel_url)
+            # 已在该频道标签页：无需任何 RPC（标签页失效时后续脚本执行会报错，由监控错误处理恢复）
+            if handle and handle == self._current_handle:
+                return True
             # 句柄存在且有效
             if handle and handle in self.driver.window_handles:
-                # 获取当前窗口句柄，如果当前窗口已关闭，设为 None
-                try:
-                    current_handle = self.driver.current_window_handle
-                except Exception:
-                    current_handle = None
-
-                if current_handle != handle:
-                    logger.info("⏳ 正在切换到频道标签页...")
-                    # logger.info(f"   URL: {channel_url}")
-                    self.driver.switch_to.window(handle)
-                    time.sleep(0.1)
+                logger.info("⏳ 正在切换到频道标签页...")
+                # logger.info(f"   URL: {channel_url}")
+                self.driver.switch_to.window(handle)
+                self._current_handle = handle
                 return True
 
             # 2. 尝试通过已开启的标签页反查URL匹配的句柄
@@ -156,8 +349,8 @@ class DiscordListener:
             if not self.channel_handles:
                 logger.info(f"⏳ 初始化频道，覆盖当前页面: {channel_url}")
                 self.driver.get(channel_url)
-                self.channel_handles[channel_url] = self.driver.current_window_handle
-                time.sleep(1)
+                self._current_handle = self.channel_handles[channel_url] = self.driver.current_window_handle
+                self._wait_page_ready()
                 return True
 
             # 否则新建标签页
@@ -180,13 +373,43 @@ class DiscordListener:
             # === 使用 Selenium 4 新 API ===
             self.driver.switch_to.new_window('tab')
             self.driver.get(channel_url)
-            self.channel_handles[channel_url] = self.driver.current_window_handle
+            self._current_handle = self.channel_handles[channel_url] = self.driver.current_window_handle
+            self._wait_page_ready()
             
             return True
         except Exception as e:
+            self._current_handle = None
             logger.error(f"切换频道标签页失败: {e}")
             return False
     
+    def _cdp_eval(self, expression: str):
+        """
+        通过 CDP Runtime.evaluate 在当前标签页执行表达式，省去 execute_script 的脚本包装与参数序列化
+        :param expression: JS 表达式
+        :return: 表达式结果（按值返回）
+        """
+        response = self.driver.execute_cdp_cmd('Runtime.evaluate', {
+            'expression': expression,
+            'returnByValue': True,
+        })
+        details = response.get('exceptionDetails')
+        if details:
+            raise JavascriptException(
+                (details.get('exception') or {}).get('description') or details.get('text') or 'Runtime.evaluate failed'
+            )
+        return response.get('result', {}).get('value')
+    
+    def _collect(self, last_message_id: Optional[str]):
+        """执行页面内增量提取脚本，返回 COLLECT_NEW_MESSAGES_JS 的结果"""
+        if not self._use_cdp:
+            return self.driver.execute_script(COLLECT_NEW_MESSAGES_JS, last_message_id)
+        expression = _COLLECT_CALL_JS % json.dumps(last_message_id)
+        result = self._cdp_eval(expression)
+        if result == _COLLECT_MISSING:
+            self._cdp_eval(_COLLECT_INSTALL_JS)
+            result = self._cdp_eval(expression)
+        return result
+    
     def get_channel_name(self, channel_url: str) -> str:
         """从URL中提取频道标识"""
         try:
@@ -197,6 +420,84 @@ class DiscordListener:
         except:
             return "未知频道"
     
+    def _poll_channel(self, channel_idx: int, channel_url: str) -> bool:
+        """
+        轮询单个频道：提取上次之后的新消息并回调
+        :param channel_idx: 频道序号（用于日志）
+        :param channel_url: 频道URL
+        :return: 本次是否发现新消息
+        """
+        if not self.switch_to_channel(channel_url):
+            # 主动抛出异常，以便触发调用方的错误计数和恢复逻辑
+            raise Exception("无法切换到频道标签页 (Switch failed)")
+        
+        last_message_id = self.last_message_ids.get(channel_url)
+        result = self._collect(last_message_id)
+        
+        if not result:
+            # 消息列表尚未加载（或页面重载中）：本轮跳过，超过时限才按错误处理
+            since = self._empty_since.setdefault(channel_url, time.monotonic())
+            if time.monotonic() - since > _LIST_LOAD_TIMEOUT:
+                del self._empty_since[channel_url]
+                raise TimeoutException("等待消息列表加载超时")
+            return False
+        self._empty_since.pop(channel_url, None)
+        
+        status = result['status']
+        payloads = result['messages']
+        
+        if status == 'first':
+            logger.info("🎬 频道 [%d/%d] 首次运行，从最新消息开始监控", channel_idx + 1, len(self.channel_urls))
+        elif status == 'missing':
+            logger.info("⚠️  频道 [%d] 未找到上次消息记录，可能页面已刷新", channel_idx + 1)
+        
+        if not payloads:
+            return False
+        
+        if len(payloads) > 1:
+            logger.info("📬 频道 [%d] 发现 %d 条新消息，依次处理中...", channel_idx + 1, len(payloads))
+        
+        channel_name = self.channel_names[channel_url]
+        log_info = logger.isEnabledFor(logging.INFO)
+        batch = []
+        for idx, payload in enumerate(payloads, 1):
+            # 构建 DiscordMessage 对象
+            try:
+                msg_obj = DiscordParser.from_payload(
+                    payload, channel_url, channel_name,
+                    fallback_username=self.last_username_by_channel.get(channel_url)
+                )
+            except Exception as e:
+                logger.error("❌ 提取消息信息失败: %s", e)
+                continue
+            
+            if payload.get('username'):
+                self.last_username_by_channel[channel_url] = payload['username']
+            
+            # 只有页面上真实的时间戳参与比较和记录：没有时间戳的消息用的是本地当前时间，记录下来会误跳过后续消息
+            if DiscordParser.parse_timestamp(payload.get('timestamp')) is not None:
+                last_ts = self.last_timestamps.get(channel_url)
+                if last_ts and msg_obj.timestamp <= last_ts:
+                    logger.debug("   跳过已处理的消息: %s", msg_obj.id)
+                    continue
+                self.last_timestamps[channel_url] = msg_obj.timestamp
+            
+            if log_info:
+                if len(payloads) > 1:
+                    logger.info("\n📨 频道 [%d] 新消息 [%d/%d]:", channel_idx + 1, idx, len(payloads))
+                else:
+                    logger.info("\n📨 频道 [%d] 新消息:", channel_idx + 1)
+                logger.info("   用户: %s", msg_obj.username)
+                logger.info("   内容: %.50s...", msg_obj.content)
+            batch.append(msg_obj)
+        
+        # 同一轮的新消息合并为一次回调，由发送器决定是否合并发送
+        if batch:
+            self._delivery_queue.put(batch)
+        # 即使全部被跳过也推进游标，避免下一轮再次判定为“未找到上次消息”
+        self.last_message_ids[channel_url] = sys.intern(payloads[-1]['id'])
+        return bool(batch)
+    
     def monitor_messages(self):
         """监控Discord消息"""
         logger.info("✅ 所有准备工作已完成，开始监控消息...")
@@ -206,86 +507,25 @@ class DiscordListener:
         channel_errors = {url: 0 for url in self.channel_urls}
         max_errors = 5
         
+        # 自适应轮询间隔：有新消息时回到最短间隔，连续空闲时逐步放宽，最长不超过配置的 check_interval
+        min_interval = min(1.0, self.check_interval)
+        max_interval = self.check_interval
+        current_interval = min_interval
+        
         while True:
+            round_start = time.monotonic()
+            has_new = False
             for channel_idx, channel_url in enumerate(self.channel_urls):
                 try:
-                    if not self.switch_to_channel(channel_url):
-                        # 主动抛出异常，以便触发下方的错误计数和恢复逻辑
-                        raise Exception("无法切换到频道标签页 (Switch failed)")
-                    
-                    WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, 'li[id^="chat-messages-"]'))
-                    )
-                    
-                    messages = self.driver.find_elements(
-                        By.CSS_SELECTOR,
-                        'li[id^="chat-messages-"]'
-                    )
-                    
-                    if messages:
-                        new_messages = []
-                        found_last = False
-                        last_message_id = self.last_message_ids[channel_url]
-                        
-                        if last_message_id is None:
-                            new_messages = [messages[-1]]
-                            logger.info(f"🎬 频道 [{channel_idx + 1}/{len(self.channel_urls)}] 首次运行，从最新消息开始监控")
-                        else:
-                            for message in messages:
-                                msg_id = message.get_attribute('id')
-                                if msg_id == last_message_id:
-                                    found_last = True
-                                    continue
-                                if found_last:
-                                    new_messages.append(message)
-                            
-                            if not found_last and len(new_messages) == 0:
-                                last_msg_id = messages[-1].get_attribute('id')
-                                if last_msg_id != last_message_id:
-                                    new_messages = [messages[-1]]
-                                    logger.info(f"⚠️  频道 [{channel_idx + 1}] 未找到上次消息记录，可能页面已刷新")
-                        
-                        if new_messages:
-                            if len(new_messages) > 1:
-                                logger.info(f"📬 频道 [{channel_idx + 1}] 发现 {len(new_messages)} 条新消息，依次处理中...")
-                            
-                            for idx, message_element in enumerate(new_messages, 1):
-                                # 确保元素可见以便提取信息（Parser内部不再处理滚动，交由Parser调用前确保可见？
-                                # 或者保留滚动逻辑在这里，或者在Parser里做。
-                                # 最佳实践：Listener负责交互(滚动)，Parser负责提取。
-                                try:
-                                    self.driver.execute_script(
-                                        "arguments[0].scrollIntoView({block: 'nearest'});",
-                                        message_element
-                                    )
-                                    time.sleep(0.05)
-                                except Exception:
-                                    pass
-
-                                # 提取消息并构建 DiscordMessage 对象
-                                channel_name = self.get_channel_name(channel_url)
-                                msg_obj = DiscordParser.parse_message(message_element, channel_url, channel_name)
-                                
-                                if msg_obj:
-                                    if len(new_messages) > 1:
-                                        logger.info(f"\n📨 频道 [{channel_idx + 1}] 新消息 [{idx}/{len(new_messages)}]:")
-                                    else:
-                                        logger.info(f"\n📨 频道 [{channel_idx + 1}] 新消息:")
-                                    logger.info(f"   用户: {msg_obj.username}")
-                                    logger.info(f"   内容: {msg_obj.content[:50]}...")
-                                    
-                                    # 回调
-                                    self.on_new_message(msg_obj)
-                                    
-                                    self.last_message_ids[channel_url] = msg_obj.id
-                                    
-                                    if len(new_messages) > 1 and idx < len(new_messages):
-                                        time.sleep(0.5)
+                    if self._poll_channel(channel_idx, channel_url):
+                        has_new = True
                     
                     # 成功执行，重置该频道的错误计数
                     channel_errors[channel_url] = 0
                     
                 except Exception as e:
+                    # 出错后（以及下面的刷新/关闭/重启恢复之后）当前标签页不再可信，下次切换时重新确认
+                    self._current_handle = None
                     channel_errors[channel_url] += 1
                     current_errors = channel_errors[channel_url]
                     logger.error(f"⚠️  频道 [{channel_idx + 1}] 监控错误 ({current_errors}/{max_errors}): {e}")
@@ -336,9 +576,17 @@ class DiscordListener:
                     
                     time.sleep(5)
             
-            time.sleep(self.check_interval)
+            if has_new:
+                current_interval = min_interval
+            else:
+                current_interval = min(current_interval * 1.5, max_interval)
+            # 间隔从本轮开始时计算，扣除轮询本身的耗时
+            time.sleep(max(0.0, current_interval - (time.monotonic() - round_start)))
     
     def cleanup(self):
         """清理资源"""
+        # 先让投递线程处理完已排队的消息
+        self._delivery_queue.put(_STOP)
+        self._delivery_thread.join(timeout=10)
         if self.browser_manager:
             self.browser_manager.cleanup()
@@ -1,206 +1,206 @@
 
-from datetime import datetime
-from typing import Optional, List
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+import json
+import re
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 
 from src.core.models import DiscordMessage
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-class DiscordParser:
-    """Discord 消息解析器：负责从 DOM 元素中提取数据"""
+# Discord CDN 附件链接：a[href] 需含 /attachments/ 或以媒体扩展名结尾；img[src] 需含 /attachments/
+_CDN_LINK_RE = re.compile(
+    r'(?:cdn\.discordapp\.com|media\.discordapp\.net).*(?:/attachments/|\.(?:png|jpe?g|gif|webp|mp4|mov|webm)$)',
+    re.IGNORECASE
+)
+_CDN_IMAGE_RE = re.compile(r'(?:cdn\.discordapp\.com|media\.discordapp\.net).*/attachments/', re.IGNORECASE)
+
+# Discord DOM 选择器（页面结构变化时只需修改这里）
+CHAT_LIST_CSS = '[data-list-id="chat-messages"]'
+CHAT_LI_CSS = 'li[id^="chat-messages-"]'
+USERNAME_CSS = 'h3[class*="header"] span[class*="username"]'
+CONTENT_CSS = 'div[id^="message-content-"]'
+CONTENT_FALLBACK_CSS = 'div[class*="messageContent"]'
+EMBED_CSS = ('div[class*="embedTitle"]', 'div[class*="embedDescription"]', 'div[class*="embedFieldValue"]')
+MARKUP_CSS = 'div[class*="markup"]'
+ATTACH_CSS = 'a[class*="imageWrapper"], a[class*="attachment"]'
+
+# 以 JS 常量 BASE_SEL 的形式注入页面脚本；监听器在页面内嗅探出 Discord 实际的哈希类名后
+# 存入 window.__d2wSel（精确类选择器），之后脚本优先使用，省去 [class*=] 子串匹配
+SELECTORS_JS = "const BASE_SEL = " + json.dumps({
+    "list": CHAT_LIST_CSS,
+    "item": CHAT_LI_CSS,
+    "username": USERNAME_CSS,
+    "content": CONTENT_CSS,
+    "contentFallback": CONTENT_FALLBACK_CSS,
+    "embeds": list(EMBED_CSS),
+    "markup": MARKUP_CSS,
+    "attachments": ATTACH_CSS,
+}) + ";\nconst SEL = window.__d2wSel || BASE_SEL;\n"
+
+# 在页面内一次性提取消息所需的全部字段，避免逐个 find_element / get_attribute 往返 chromedriver
+# extractMessage(el) 由监听器的批量增量提取脚本（COLLECT_NEW_MESSAGES_JS）调用
+EXTRACT_MESSAGE_FN = SELECTORS_JS + r"""
+// 嗅探出的精确类选择器没有匹配时回退到通配选择器；通配能匹配说明嗅探结果不适用，清除后下一轮重新嗅探
+function selectAll(root, css, baseCss) {
+    const found = root.querySelectorAll(css);
+    if (found.length || css === baseCss) return found;
+    const fallback = root.querySelectorAll(baseCss);
+    if (fallback.length) window.__d2wSel = null;
+    return fallback;
+}
+
+function extractMessage(el) {
+    const text = (node) => ((node && node.innerText) || '').trim();
+
+    // 1. 用户名：当前消息头部，连续消息则回溯最近 8 条消息
+    let username = text(selectAll(el, SEL.username, BASE_SEL.username)[0]);
+    if (!username) {
+        let prev = el.previousElementSibling;
+        for (let i = 0; prev && i < 8; prev = prev.previousElementSibling) {
+            if (!prev.matches(SEL.item)) continue;
+            i++;
+            username = text(selectAll(prev, SEL.username, BASE_SEL.username)[0]);
+            if (username) break;
+        }
+    }
+
+    // 2. 内容：常规内容 + Embed 标题/描述/字段
+    const parts = [];
+    let contentEls = el.querySelectorAll(SEL.content);
+    if (!contentEls.length) contentEls = selectAll(el, SEL.contentFallback, BASE_SEL.contentFallback);
+    if (contentEls.length) {
+        const t = text(contentEls[contentEls.length - 1]);
+        if (t) parts.push(t);
+    }
+    SEL.embeds.forEach((css, i) => {
+        selectAll(el, css, BASE_SEL.embeds[i]).forEach((n) => { const t = text(n); if (t) parts.push(t); });
+    });
+    const markups = selectAll(el, SEL.markup, BASE_SEL.markup);
+
+    // 3. 时间戳
+    const time = el.querySelector('time');
+
+    // 4. 附件：常规附件，没有时收集候选链接交给 Python 做 CDN 过滤
+    const attachments = Array.from(
+        selectAll(el, SEL.attachments, BASE_SEL.attachments), (a) => a.href
+    ).filter(Boolean);
+    const links = attachments.length ? [] :
+        Array.from(el.querySelectorAll('a[href]'), (a) => (a.href || '').trim()).filter(Boolean);
+    const images = attachments.length ? [] :
+        Array.from(el.querySelectorAll('img[src]'), (img) => (img.src || '').trim()).filter(Boolean);
+
+    return {
+        id: el.id,
+        username: username || null,
+        aria_label: el.getAttribute('aria-label'),
+        content_parts: parts,
+        markup: markups.length ? markups[markups.length - 1].innerText : '',
+        timestamp: time ? time.getAttribute('datetime') : null,
+        attachments: attachments,
+        links: links,
+        images: images
+    };
+}
+"""
 
-    @staticmethod
-    def parse_message(message_element, channel_url: str, channel_name: str) -> Optional[DiscordMessage]:
-        """从消息元素中提取 DiscordMessage"""
-        try:
-            message_id = message_element.get_attribute('id')
-            
-            # 1. 提取用户名
-            username = DiscordParser._extract_username(message_element)
-            
-            # 2. 提取内容
-            content = DiscordParser._extract_content(message_element)
-            
-            # 3. 提取时间戳
-            timestamp = DiscordParser._extract_timestamp(message_element)
-            
-            # 4. 提取附件
-            attachments = DiscordParser._extract_attachments(message_element)
-            
-            # 内容兜底
-            content = DiscordParser._finalize_content(content, attachments, message_element)
-
-            return DiscordMessage(
-                id=message_id,
-                username=username,
-                content=content,
-                timestamp=timestamp,
-                channel_url=channel_url,
-                attachments=attachments,
-                channel_name=channel_name
-            )
-            
-        except Exception as e:
-            logger.error(f"❌ 提取消息信息失败: {e}")
-            return None
+
+class DiscordParser:
+    """Discord 消息解析器：负责将页面内提取的原始数据构建为 DiscordMessage"""
 
     @staticmethod
-    def _extract_username(element) -> str:
-        username = "未知用户"
-        try:
-            username_element = element.find_element(
-                By.CSS_SELECTOR, 'h3[class*="header"] span[class*="username"]'
-            )
-            return username_element.text
-        except (NoSuchElementException, StaleElementReferenceException):
-            # 尝试回溯查找（针对连续消息）
-            return DiscordParser._trace_back_username(element) or \
-                   DiscordParser._extract_username_from_aria(element) or \
+    def from_payload(
+        payload: Dict[str, Any],
+        channel_url: str,
+        channel_name: str,
+        fallback_username: Optional[str] = None
+    ) -> DiscordMessage:
+        """
+        由页面内提取的原始数据构建 DiscordMessage
+        :param fallback_username: 页面内和 aria-label 都取不到用户名时使用（如该频道最近一次出现的作者）
+        """
+        # 1. 用户名
+        username = payload.get('username') or \
+                   DiscordParser._extract_username_from_aria(payload.get('aria_label')) or \
+                   fallback_username or \
                    "未知用户"
 
+        # 2. 内容
+        content = "\n".join(payload.get('content_parts') or []) or "[无法获取消息内容]"
+
+        # 3. 时间戳（页面上取不到或无法解析时使用当前时间）
+        timestamp = DiscordParser.parse_timestamp(payload.get('timestamp')) or datetime.now(timezone.utc)
+
+        # 4. 附件
+        attachments = DiscordParser._extract_attachments(payload)
+
+        # 内容兜底
+        content = DiscordParser._finalize_content(content, attachments, payload.get('markup') or '')
+
+        return DiscordMessage(
+            # 消息ID会在游标、日志和去重中反复出现，驻留后共享同一个字符串对象
+            id=sys.intern(payload['id']),
+            username=username,
+            content=content,
+            timestamp=timestamp,
+            channel_url=channel_url,
+            attachments=tuple(attachments),
+            channel_name=channel_name
+        )
+
     @staticmethod
-    def _trace_back_username(element) -> Optional[str]:
-        try:
-            prev_items = element.find_elements(
-                By.XPATH, 'preceding-sibling::li[starts-with(@id, "chat-messages-")]'
-            )
-            for prev in reversed(prev_items[-8:]):
-                try:
-                    el = prev.find_element(By.CSS_SELECTOR, 'h3[class*="header"] span[class*="username"]')
-                    if el.text:
-                        return el.text
-                except Exception:
-                    continue
-        except Exception:
-            pass
+    def _extract_username_from_aria(aria_label: Optional[str]) -> Optional[str]:
+        if aria_label:
+            name = aria_label.split(',')[0].strip()
+            if name: return name
         return None
 
     @staticmethod
-    def _extract_username_from_aria(element) -> Optional[str]:
+    def parse_timestamp(timestamp_str: Optional[str]) -> Optional[datetime]:
+        """
+        解析消息的 time[datetime]（标准 ISO 8601，如 2024-05-01T10:00:00.000Z）
+        :return: 带时区的 datetime，缺失或无法解析时返回 None
+        """
         try:
-            aria_label = element.get_attribute('aria-label')
-            if aria_label:
-                name = aria_label.split(',')[0].strip()
-                if name: return name
-        except Exception:
+            if timestamp_str:
+                return datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+        except ValueError:
             pass
         return None
 
     @staticmethod
-    def _extract_content(element) -> str:
-        content_parts = []
-        try:
-            # 1. 常规消息内容
-            content_elements = element.find_elements(By.CSS_SELECTOR, 'div[id^="message-content-"]')
-            if not content_elements:
-                content_elements = element.find_elements(By.CSS_SELECTOR, 'div[class*="messageContent"]')
-            if content_elements:
-                text = content_elements[-1].text.strip()
-                if text: content_parts.append(text)
-
-            # 2. Embed (被包裹) 消息内容 - Title
-            embed_titles = element.find_elements(By.CSS_SELECTOR, 'div[class*="embedTitle"]')
-            for title in embed_titles:
-                text = title.text.strip()
-                if text: content_parts.append(text)
-
-            # 3. Embed (被包裹) 消息内容 - Description
-            embed_descriptions = element.find_elements(By.CSS_SELECTOR, 'div[class*="embedDescription"]')
-            for desc in embed_descriptions:
-                text = desc.text.strip()
-                if text: content_parts.append(text)
-                
-            # 4. Embed (被包裹) 消息内容 - Fields
-            embed_fields = element.find_elements(By.CSS_SELECTOR, 'div[class*="embedFieldValue"]')
-            for field in embed_fields:
-                text = field.text.strip()
-                if text: content_parts.append(text)
-
-            if content_parts:
-                return "\n".join(content_parts)
-        except Exception:
-            pass
-        return "[无法获取消息内容]"
+    def _extract_attachments(payload: Dict[str, Any]) -> List[str]:
+        # 常规附件
+        attachments = list(payload.get('attachments') or [])
 
-    @staticmethod
-    def _extract_timestamp(element) -> datetime:
-        try:
-            time_element = element.find_element(By.CSS_SELECTOR, 'time')
-            timestamp_str = time_element.get_attribute('datetime')
-            if timestamp_str:
-                from dateutil import parser
-                return parser.isoparse(timestamp_str)
-        except Exception:
-            pass
-        return datetime.now()
+        # CDN 兜底
+        if not attachments:
+            attachments.extend(DiscordParser._extract_cdn_links(
+                payload.get('links') or [], payload.get('images') or []
+            ))
 
-    @staticmethod
-    def _extract_attachments(element) -> List[str]:
-        attachments = []
-        try:
-            # 常规附件
-            atts = element.find_elements(By.CSS_SELECTOR, 'a[class*="imageWrapper"], a[class*="attachment"]')
-            for att in atts:
-                href = att.get_attribute('href')
-                if href: attachments.append(href)
-            
-            # CDN 兜底
-            if not attachments:
-                attachments.extend(DiscordParser._extract_cdn_links(element))
-                
-            # 去重
-            if attachments:
-                seen = set()
-                attachments = [x for x in attachments if not (x in seen or seen.add(x))]
-                
-        except Exception:
-            pass
-        return attachments
+        # 去重（保持原有顺序）
+        return list(dict.fromkeys(attachments))
 
     @staticmethod
-    def _extract_cdn_links(element) -> List[str]:
-        links = []
-        cdn_hosts = ['cdn.discordapp.com', 'media.discordapp.net']
-        exts = ['.png', '.jpg', '.jpeg', '.gif', '.webp', '.mp4', '.mov', '.webm']
-        
-        try:
-            # Check a[href]
-            all_links = element.find_elements(By.CSS_SELECTOR, 'a[href]')
-            for link in all_links:
-                href = (link.get_attribute('href') or '').strip()
-                if not href: continue
-                lower = href.lower()
-                if (any(h in lower for h in cdn_hosts) and 
-                   ('/attachments/' in lower or any(lower.endswith(e) for e in exts))):
-                    links.append(href)
-            
-            # Check img[src] if empty
-            if not links:
-                all_imgs = element.find_elements(By.CSS_SELECTOR, 'img[src]')
-                for img in all_imgs:
-                    src = (img.get_attribute('src') or '').strip()
-                    if not src: continue
-                    lower = src.lower()
-                    if any(h in lower for h in cdn_hosts) and '/attachments/' in lower:
-                        links.append(src)
-        except Exception:
-            pass
+    def _extract_cdn_links(hrefs: List[str], srcs: List[str]) -> List[str]:
+        # Check a[href]
+        links = [href for href in hrefs if _CDN_LINK_RE.search(href)]
+
+        # Check img[src] if empty
+        if not links:
+            links = [src for src in srcs if _CDN_IMAGE_RE.search(src)]
         return links
 
     @staticmethod
-    def _finalize_content(content: str, attachments: List[str], element) -> str:
+    def _finalize_content(content: str, attachments: List[str], markup: str) -> str:
         if content == "[无法获取消息内容]" or not content.strip():
-            # 获取 markup
-            try:
-                markup = element.find_elements(By.CSS_SELECTOR, 'div[class*="markup"]')
-                if markup and markup[-1].text.strip():
-                    content = markup[-1].text
-            except Exception:
-                pass
-            
+            # 使用 markup 文本
+            if markup.strip():
+                content = markup
+
             # 仍然获取不到时，看有没有附件
             if content == "[无法获取消息内容]" or not content.strip():
                 if attachments:
@@ -208,4 +208,3 @@ class DiscordParser:
                 else:
                     content = "[无法获取消息内容]"
         return content
-
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+消息发送器包
+各发送器在首次访问时才导入（PEP 562），避免加载用不到的 itchat / requests 依赖
+"""
+
+import importlib
+
+_LAZY = {
+    "MessageSender": "src.services.sender.base",
+    "WechatSender": "src.services.sender.wechat",
+    "WorkingWechatSender": "src.services.sender.working_wechat",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    module_name = _LAZY.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    obj = getattr(importlib.import_module(module_name), name)
+    # 缓存到模块命名空间，后续访问不再经过 __getattr__
+    globals()[name] = obj
+    return obj
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
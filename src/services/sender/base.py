@@ -5,11 +5,69 @@
 定义统一的消息发送接口，方便扩展多种发送方式
 """
 
+from __future__ import annotations
+
+import time
 from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import List, Optional
 from src.core.models import DiscordMessage
 from zoneinfo import ZoneInfo
 from datetime import datetime
 
+# 北京时区对象只构建一次
+_SHANGHAI_TZ = ZoneInfo('Asia/Shanghai')
+_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# 当前时间字符串按秒缓存：同一秒内的多条消息复用同一个格式化结果
+_LAST_NOW = [0, ""]
+
+
+def _now_str() -> str:
+    now_s = int(time.time())
+    if now_s != _LAST_NOW[0]:
+        _LAST_NOW[:] = [now_s, datetime.fromtimestamp(now_s, _SHANGHAI_TZ).strftime(_TIME_FORMAT)]
+    return _LAST_NOW[1]
+
+
+def _parse_iso(ts: str) -> datetime:
+    """解析 ISO 8601 时间（Discord 格式如 2024-05-01T10:00:00.000Z），兼容旧版 fromisoformat 不识别的 Z 后缀"""
+    if ts.endswith('Z'):
+        ts = ts[:-1] + '+00:00'
+    return datetime.fromisoformat(ts)
+
+
+@lru_cache(maxsize=2048)
+def _format_ts(timestamp) -> Optional[str]:
+    """时间戳 -> 北京时间字符串（带缓存：同一秒内的连发消息直接命中），无法解析时返回 None"""
+    try:
+        # 监听器传入的已是 datetime，直接转换时区；字符串仅作兜底解析
+        if isinstance(timestamp, datetime):
+            return timestamp.astimezone(_SHANGHAI_TZ).strftime(_TIME_FORMAT)
+        if isinstance(timestamp, str):
+            return _parse_iso(timestamp).astimezone(_SHANGHAI_TZ).strftime(_TIME_FORMAT)
+    except Exception:
+        pass
+    return None
+
+
+def format_beijing_time(timestamp) -> str:
+    """
+    将消息时间戳格式化为北京时间（Asia/Shanghai）字符串
+    :param timestamp: datetime 或 ISO 8601 字符串，为空或无法解析时使用当前时间
+    :return: 形如 2024-05-01 18:00:00 的字符串
+    """
+    if timestamp:
+        try:
+            formatted = _format_ts(timestamp)
+        except TypeError:
+            # 不可哈希的类型，无法缓存也无法格式化
+            formatted = None
+        if formatted:
+            return formatted
+    return _now_str()
+
+
 class MessageSender(ABC):
     """消息发送器抽象基类"""
     
@@ -34,6 +92,15 @@ class MessageSender(ABC):
         """
         pass
     
+    def send_messages(self, messages: List[DiscordMessage]) -> bool:
+        """
+        批量发送同一轮发现的新消息（默认逐条发送，可被子类重写为合并发送）
+        :param messages: Discord消息对象列表
+        :return: 是否全部发送成功
+        """
+        results = [self.send_message(message) for message in messages]
+        return all(results)
+    
     @abstractmethod
     def keep_alive(self):
         """
@@ -56,34 +123,21 @@ class MessageSender(ABC):
         :return: 格式化后的消息文本
         """
         # 转换时间为北京时间
-        try:
-            if message.timestamp:
-                # 假设已经是 datetime 对象（如果是字符串在 listener 里转换更好，这里做兜底）
-                if isinstance(message.timestamp, str):
-                    from dateutil import parser
-                    bj_time = parser.isoparse(message.timestamp).astimezone(ZoneInfo('Asia/Shanghai'))
-                elif isinstance(message.timestamp, datetime):
-                     bj_time = message.timestamp.astimezone(ZoneInfo('Asia/Shanghai'))
-                else:
-                    bj_time = datetime.now(ZoneInfo('Asia/Shanghai'))
-            else:
-                bj_time = datetime.now(ZoneInfo('Asia/Shanghai'))
-            
-            bj_time_str = bj_time.strftime('%Y-%m-%d %H:%M:%S')
-        except Exception:
-            bj_time_str = datetime.now(ZoneInfo('Asia/Shanghai')).strftime('%Y-%m-%d %H:%M:%S')
-
-        content = f"来自 {message.username} 消息\n"
-        # if message.channel_name:
-        #      content += f"({message.channel_name})\n"
-        content += f"🕐 时间: {bj_time_str}\n"
-        content += f"━━━━━━━━━━━━\n"
-        content += f"{message.content}\n"
+        bj_time_str = format_beijing_time(message.timestamp)
+
+        username = message.username or '未知用户'
+        attachments = message.attachments or ()
+        
+        parts = [
+            f"来自 {username} 消息",
+            f"🕐 时间: {bj_time_str}",
+            "━━━━━━━━━━━━",
+            f"{message.content or ''}\n",
+        ]
         
-        if message.attachments:
-            content += f"\n📎 附件({len(message.attachments)}):\n"
-            for i, att in enumerate(message.attachments[:3], 1):
-                content += f"{i}. {att}\n"
+        if attachments:
+            parts.append(f"📎 附件({len(attachments)}):")
+            parts.append("".join(f"{i}. {att}\n" for i, att in enumerate(attachments[:3], 1)))
         
-        return content
+        return "\n".join(parts)
 
@@ -6,6 +6,8 @@
 """
 
 import threading
+import time
+from typing import List, Optional
 import itchat
 from .base import MessageSender
 from src.core.models import DiscordMessage
@@ -13,6 +15,9 @@ from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 个人号连续发送时每条消息之间的间隔（秒），避免短时间内连发触发风控
+_SEND_INTERVAL = 0.5
+
 class WechatSender(MessageSender):
     """微信个人号发送器"""
     
@@ -24,6 +29,7 @@ class WechatSender(MessageSender):
         super().__init__()
         self.receiver_name = receiver_name
         self.receiver = None
+        self._receiver_username: Optional[str] = None
         self.wechat_thread = None
     
     def login(self) -> bool:
@@ -50,6 +56,7 @@ class WechatSender(MessageSender):
             
             if friends:
                 self.receiver = friends[0]
+                self._receiver_username = self.receiver['UserName']
                 logger.info(f"✅ 找到联系人: {self.receiver['NickName']}")
                 self.is_ready = True
                 return True
@@ -70,7 +77,7 @@ class WechatSender(MessageSender):
         :param message: Discord消息对象
         :return: 是否发送成功
         """
-        if not self.is_ready or not self.receiver:
+        if not self.is_ready or not self._receiver_username:
             logger.warning("⚠️  微信未就绪，跳过发送")
             return False
         
@@ -79,18 +86,35 @@ class WechatSender(MessageSender):
             content = self.format_message(message)
             
             # 发送到微信
-            itchat.send(content, toUserName=self.receiver['UserName'])
-            logger.info(f"✅ 消息已发送到微信: {message.content[:30]}...")
+            itchat.send(content, toUserName=self._receiver_username)
+            logger.info("✅ 消息已发送到微信: %.30s...", message.content)
             return True
             
         except Exception as e:
-            logger.error(f"❌ 发送微信消息失败: {e}")
+            logger.error("❌ 发送微信消息失败: %s", e)
             return False
     
+    def send_messages(self, messages: List[DiscordMessage]) -> bool:
+        """
+        逐条发送同一轮的新消息，相邻两条之间间隔 _SEND_INTERVAL 秒
+        :param messages: Discord消息对象列表
+        :return: 是否全部发送成功
+        """
+        results = []
+        for idx, message in enumerate(messages):
+            if idx:
+                time.sleep(_SEND_INTERVAL)
+            results.append(self.send_message(message))
+        return all(results)
+    
     def keep_alive(self):
         """
         在独立线程中运行微信（保持心跳）
         """
+        # 线程已在运行时不再重复创建
+        if self.wechat_thread and self.wechat_thread.is_alive():
+            return
+        
         def run_wechat():
             if self.is_ready:
                 logger.info("🔄 微信监听线程已启动（保持在线状态）")
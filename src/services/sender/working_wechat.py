@@ -5,17 +5,44 @@
 使用企业微信机器人Webhook API发送消息
 """
 
+import hashlib
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, List, Optional
-from datetime import datetime
-from dateutil import parser
-from zoneinfo import ZoneInfo
-from .base import MessageSender
+from .base import MessageSender, format_beijing_time
 from src.core.models import DiscordMessage
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 发送队列容量与停止信号
+_QUEUE_SIZE = 1000
+_STOP = object()
+
+# 不同Webhook之间并发发送的最大线程数（需不超过连接池大小）
+_MAX_PARALLEL_HOOKS = 8
+
+# 企业微信 markdown 消息内容上限为 4096 字节，发送线程合并消息时按此切分
+_MARKDOWN_MAX_BYTES = 4096
+_BATCH_SEPARATOR = "\n---\n"
+
+# 合并窗口：收到第一条后最多再等 1 秒或凑满 10 条，同一Webhook的消息合并为一次请求
+_BATCH_WINDOW = 1.0
+_BATCH_MAX_ITEMS = 10
+
+# 最近发送过的消息指纹数量上限（按 id + 内容去重，避免重连后重复推送）
+_DEDUP_SIZE = 10000
+
+# Markdown 消息模板，模块加载时构建一次，每条消息只做一次 str.format
+_MARKDOWN_TEMPLATE = "来自 **{username}** 消息\n> 🕐 时间: {time}\n\n{content}\n{attachments}"
+_ATTACHMENTS_TEMPLATE = "\n**📎 附件({count}):**\n{items}"
+
 class WorkingWechatSender(MessageSender):
     """企业微信机器人发送器"""
     
@@ -29,6 +56,26 @@ class WorkingWechatSender(MessageSender):
         self.webhook_url = webhook_url
         self.webhook_configs = webhook_configs or []
         self.webhook_map = {}
+        self._seen: "OrderedDict[bytes, None]" = OrderedDict()
+        
+        # 复用连接，避免每条消息重新建立 TCP/TLS 连接
+        self.session = requests.Session()
+        # POST 不是幂等请求：只重试连接失败和 429 限流（请求未被处理），读超时/5xx 不重试，避免群里收到重复消息
+        retry = Retry(
+            total=3,
+            read=0,
+            backoff_factor=0.5,
+            status_forcelist=[429],
+            allowed_methods=frozenset(['POST'])
+        )
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=10, max_retries=retry))
+        
+        # 后台发送线程：send_message 只负责入队，不阻塞 Discord 监听循环
+        self._queue = queue.Queue(maxsize=_QUEUE_SIZE)
+        self._worker_thread = threading.Thread(target=self._worker, daemon=True)
+        self._worker_thread.start()
+        # 不同Webhook（不同群）的消息并发发送，同一Webhook内保持顺序
+        self._executor = ThreadPoolExecutor(max_workers=_MAX_PARALLEL_HOOKS)
         
         # 建立频道到Webhook的映射
         if self.webhook_configs:
@@ -39,6 +86,8 @@ class WorkingWechatSender(MessageSender):
                     # 去除可能的尾部斜杠以匹配
                     normalized_channel = channel.rstrip('/')
                     self.webhook_map[normalized_channel] = hook
+        # 前缀匹配表：按长度降序，优先匹配最具体的频道URL
+        self._hook_prefixes = sorted(self.webhook_map.items(), key=lambda kv: -len(kv[0]))
     
     def login(self) -> bool:
         """
@@ -64,39 +113,16 @@ class WorkingWechatSender(MessageSender):
             logger.error("提示：在企业微信群中添加机器人，获取Webhook地址")
             return False
             
-        success_count = 0
         total_count = len(hooks_to_test)
         
         logger.info(f"正在验证 {total_count} 个Webhook地址...")
         
-        for i, hook_url in enumerate(hooks_to_test, 1):
-            try:
-                # 发送测试消息验证连接
-                test_data = {
-                    "msgtype": "text",
-                    "text": {
-                        "content": f"✅ 企业微信机器人初始化成功 ({i}/{total_count})\nDiscord消息桥接器已启动"
-                    }
-                }
-                
-                response = requests.post(
-                    hook_url,
-                    json=test_data,
-                    timeout=30
-                )
-                
-                result = response.json()
-                
-                if result.get('errcode') == 0:
-                    logger.info(f"✅ Webhook {i} 连接成功！")
-                    success_count += 1
-                else:
-                    logger.error(f"❌ Webhook {i} 连接失败: {result.get('errmsg', '未知错误')}")
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"❌ Webhook {i} 连接失败: {e}")
-            except Exception as e:
-                logger.error(f"❌ Webhook {i} 初始化异常: {e}")
+        # 并发验证所有Webhook，总耗时取决于最慢的一个
+        futures = [
+            self._executor.submit(self._probe_hook, i, hook_url, total_count)
+            for i, hook_url in enumerate(hooks_to_test, 1)
+        ]
+        success_count = sum(1 for future in futures if future.result())
         
         if success_count > 0:
             logger.info(f"✅ 成功连接 {success_count}/{total_count} 个机器人的Webhook")
@@ -106,39 +132,193 @@ class WorkingWechatSender(MessageSender):
             logger.error("❌ 所有Webhook连接均失败")
             return False
     
+    def _probe_hook(self, i: int, hook_url: str, total_count: int) -> bool:
+        """
+        发送测试消息验证单个Webhook
+        :param i: 序号（用于日志和测试消息）
+        :param hook_url: Webhook地址
+        :param total_count: Webhook总数
+        :return: 是否连接成功
+        """
+        try:
+            # 发送测试消息验证连接
+            test_data = {
+                "msgtype": "text",
+                "text": {
+                    "content": f"✅ 企业微信机器人初始化成功 ({i}/{total_count})\nDiscord消息桥接器已启动"
+                }
+            }
+            
+            response = self.session.post(
+                hook_url,
+                json=test_data,
+                timeout=30
+            )
+            
+            result = response.json()
+            
+            if result.get('errcode') == 0:
+                logger.info(f"✅ Webhook {i} 连接成功！")
+                return True
+            logger.error(f"❌ Webhook {i} 连接失败: {result.get('errmsg', '未知错误')}")
+                
+        except requests.exceptions.RequestException as e:
+            logger.error(f"❌ Webhook {i} 连接失败: {e}")
+        except Exception as e:
+            logger.error(f"❌ Webhook {i} 初始化异常: {e}")
+        return False
+    
     def get_webhook_for_channel(self, channel_url: str) -> Optional[str]:
         """根据频道URL获取对应的Webhook"""
         if not channel_url:
             return self.webhook_url
             
-        # 尝试精确匹配
-        normalized_url = channel_url.rstrip('/')
-        if normalized_url in self.webhook_map:
-            return self.webhook_map[normalized_url]
+        # 尝试精确匹配（映射的键已去除尾部斜杠，通常无需再处理URL）
+        hook = self.webhook_map.get(channel_url) or self.webhook_map.get(channel_url.rstrip('/'))
+        if hook:
+            return hook
+        
+        # 前缀匹配（URL 带查询参数、消息ID等后缀时），前缀之后必须是路径/参数分隔符
+        for prefix, hook in self._hook_prefixes:
+            if channel_url.startswith(prefix) and channel_url[len(prefix):len(prefix) + 1] in ('/', '?', '#'):
+                return hook
             
         # 如果没有特定匹配，但有默认的单个webhook，则使用它
         return self.webhook_url
 
     def send_message(self, message: DiscordMessage) -> bool:
         """
-        发送消息到企业微信群
+        将消息加入发送队列，由后台线程发送到企业微信群
         :param message: Discord消息对象
-        :return: 是否发送成功
+        :return: 是否成功加入队列
         """
         if not self.is_ready:
             logger.warning("⚠️  企业微信机器人未就绪，跳过发送")
             return False
             
+        if self._is_duplicate(message):
+            logger.info("⏭️  跳过重复消息: %.30s...", message.content)
+            return True
+        
         target_webhook = self.get_webhook_for_channel(message.channel_url)
         
         if not target_webhook:
-            logger.warning(f"⚠️  未找到频道 [{message.channel_name}] 对应的Webhook配置，且无默认Webhook")
+            logger.warning("⚠️  未找到频道 [%s] 对应的Webhook配置，且无默认Webhook", message.channel_name)
             return False
             
         try:
             # 使用Markdown格式发送消息
-            content = self._format_markdown_message(message)
+            content = self.format_message(message)
+        except Exception as e:
+            logger.error("❌ 格式化企业微信消息异常: %s", e)
+            return False
+        
+        self._enqueue((target_webhook, content, message.content))
+        return True
+    
+    def _is_duplicate(self, message: DiscordMessage) -> bool:
+        """
+        判断消息最近是否已发送过，未发送过则记录其指纹
+        :param message: Discord消息对象
+        :return: 是否重复
+        """
+        key = hashlib.blake2b(f"{message.id}|{message.content}".encode('utf-8'), digest_size=8).digest()
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            return True
+        self._seen[key] = None
+        if len(self._seen) > _DEDUP_SIZE:
+            self._seen.popitem(last=False)
+        return False
+    
+    def _enqueue(self, item):
+        """入队；队列已满时丢弃最旧的一条"""
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    logger.warning("⚠️  企业微信发送队列已满，丢弃最早的一条消息")
+                except queue.Empty:
+                    pass
+    
+    def _worker(self):
+        """后台发送线程：在合并窗口内收集消息，按Webhook分组合并后并发发送"""
+        stopping = False
+        while not stopping:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + _BATCH_WINDOW
+            while items[-1] is not _STOP and len(items) < _BATCH_MAX_ITEMS:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # 窗口结束后顺带取走已积压的消息
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
             
+            grouped: Dict[str, list] = {}
+            for item in items:
+                if item is _STOP:
+                    stopping = True
+                    continue
+                grouped.setdefault(item[0], []).append(item)
+            
+            if len(grouped) == 1:
+                self._send_group(next(iter(grouped.values())))
+            elif grouped:
+                wait([self._executor.submit(self._send_group, group) for group in grouped.values()])
+    
+    def _send_group(self, items: list):
+        """依次发送同一Webhook的消息，保证顺序"""
+        for webhook, content, summary in self._merge_items(items):
+            self._do_send(webhook, content, summary)
+    
+    def _merge_items(self, items: list) -> List[tuple]:
+        """
+        将同一Webhook的多条待发送消息拼接为尽量少的请求，每条不超过企业微信的长度上限
+        :param items: [(webhook, content, summary), ...]
+        :return: 合并后的 [(webhook, content, summary), ...]
+        """
+        groups: List[list] = []
+        size = 0
+        sep_size = len(_BATCH_SEPARATOR.encode('utf-8'))
+        
+        for item in items:
+            item_size = len(item[1].encode('utf-8'))
+            if groups and size + sep_size + item_size <= _MARKDOWN_MAX_BYTES:
+                groups[-1].append(item)
+                size += sep_size + item_size
+            else:
+                groups.append([item])
+                size = item_size
+        
+        merged = []
+        for group in groups:
+            webhook, content, summary = group[0]
+            if len(group) > 1:
+                content = _BATCH_SEPARATOR.join(item[1] for item in group)
+                summary = f"[{len(group)}条] {summary}"
+            merged.append((webhook, content, summary))
+        return merged
+    
+    def _do_send(self, webhook: str, content: str, summary: str) -> bool:
+        """
+        发送一条Markdown消息到指定Webhook
+        :param webhook: 目标Webhook地址
+        :param content: Markdown消息内容
+        :param summary: 用于日志的原始消息内容
+        :return: 是否发送成功
+        """
+        try:
             data = {
                 "msgtype": "markdown",
                 "markdown": {
@@ -146,8 +326,8 @@ class WorkingWechatSender(MessageSender):
                 }
             }
             
-            response = requests.post(
-                target_webhook,
+            response = self.session.post(
+                webhook,
                 json=data,
                 timeout=30
             )
@@ -155,54 +335,40 @@ class WorkingWechatSender(MessageSender):
             result = response.json()
             
             if result.get('errcode') == 0:
-                logger.info(f"✅ 消息已发送到企业微信: {message.content[:30]}...")
+                logger.info("✅ 消息已发送到企业微信: %.30s...", summary)
                 return True
             else:
-                logger.error(f"❌ 发送企业微信消息失败: {result.get('errmsg', '未知错误')}")
+                logger.error("❌ 发送企业微信消息失败: %s", result.get('errmsg', '未知错误'))
                 return False
                 
         except requests.exceptions.RequestException as e:
-            logger.error(f"❌ 发送企业微信消息网络错误: {e}")
+            logger.error("❌ 发送企业微信消息网络错误: %s", e)
             return False
         except Exception as e:
-            logger.error(f"❌ 发送企业微信消息异常: {e}")
+            logger.error("❌ 发送企业微信消息异常: %s", e)
             return False
     
-    def _format_markdown_message(self, message: DiscordMessage) -> str:
+    def format_message(self, message: DiscordMessage) -> str:
         """
-        格式化为Markdown消息
+        格式化为Markdown消息（企业微信机器人使用Markdown格式）
         :param message: Discord消息对象
         :return: Markdown格式的消息文本
         """
         # 解析 UTC 时间戳并转换为北京时间（Asia/Shanghai）
-        try:
-            if message.timestamp:
-                if isinstance(message.timestamp, str):
-                    bj_time = parser.isoparse(message.timestamp).astimezone(ZoneInfo('Asia/Shanghai'))
-                elif isinstance(message.timestamp, datetime):
-                     bj_time = message.timestamp.astimezone(ZoneInfo('Asia/Shanghai'))
-                else:
-                    bj_time = datetime.now(ZoneInfo('Asia/Shanghai'))
-            else:
-                bj_time = datetime.now(ZoneInfo('Asia/Shanghai'))
-            bj_time_str = bj_time.strftime('%Y-%m-%d %H:%M:%S')
-        except Exception:
-            bj_time_str = datetime.now(ZoneInfo('Asia/Shanghai')).strftime('%Y-%m-%d %H:%M:%S')
+        bj_time_str = format_beijing_time(message.timestamp)
 
-        content = f"来自 **{message.username}** 消息"
-        # if message.channel_name:
-        #     content += f" ({message.channel_name})"
-        content += f"\n"
-        content += f"> 🕐 时间: {bj_time_str}\n\n"
-        
-        content += f"{message.content}\n"
-        
-        if message.attachments:
-            content += f"\n**📎 附件({len(message.attachments)}):**\n"
-            for i, att in enumerate(message.attachments[:3], 1):
-                content += f"{i}. [{att}]({att})\n"
+        attachments = message.attachments or ()
+        attachments_text = _ATTACHMENTS_TEMPLATE.format(
+            count=len(attachments),
+            items="".join(f"{i}. [{att}]({att})\n" for i, att in enumerate(attachments[:3], 1))
+        ) if attachments else ""
         
-        return content
+        return _MARKDOWN_TEMPLATE.format(
+            username=message.username or '未知用户',
+            time=bj_time_str,
+            content=message.content or '',
+            attachments=attachments_text
+        )
     
     def keep_alive(self):
         """
@@ -215,6 +381,11 @@ class WorkingWechatSender(MessageSender):
         清理资源
         """
         try:
+            # 通知发送线程退出，等待队列中剩余消息发送完毕
+            self._enqueue(_STOP)
+            self._worker_thread.join(timeout=10)
+            self._executor.shutdown(wait=False)
+            self.session.close()
             logger.info("   ✅ 企业微信机器人发送器已清理")
         except Exception as e:
             logger.debug(f"   清理企业微信发送器失败: {e}")